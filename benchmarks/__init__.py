@@ -0,0 +1,14 @@
+"""
+Benchmark suite for BIN_Eye_Comparator
+
+Run from the repository root:
+
+    python -m benchmarks --output results.json
+    python -m benchmarks --baseline results.json --threshold 0.15
+
+The corpus is generated deterministically from a seed (see benchmarks.corpus),
+so results from different runs and machines time the same work.
+"""
+
+from .corpus import CORPUS_KINDS, generate_corpus, ensure_corpus
+from .runner import SCENARIOS, run_benchmarks, compare_to_baseline
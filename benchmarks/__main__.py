@@ -0,0 +1,71 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from .corpus import DEFAULT_SEED, ensure_corpus
+from .runner import DEFAULT_THRESHOLD, SCENARIOS, BenchmarkContext, compare_to_baseline, run_benchmarks
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m benchmarks',
+        description='Benchmark the comparator hot paths on a generated corpus',
+    )
+    parser.add_argument('--corpus', default='.bench-corpus',
+                        help='Corpus directory, generated on first use (default: .bench-corpus)')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED,
+                        help=f'Corpus generator seed (default: {DEFAULT_SEED})')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiply corpus file counts and huge file size (default: 1.0)')
+    parser.add_argument('--scenario', nargs='+', choices=list(SCENARIOS),
+                        help='Only run these scenarios (default: all)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Timed runs per scenario; the fastest is compared (default: 3)')
+    parser.add_argument('--diff-backend', choices=('auto', 'numpy', 'python'), default='auto',
+                        help='Diff kernel used by the comparator (default: auto)')
+    parser.add_argument('--output', '-o',
+                        help='Write results as JSON to this file')
+    parser.add_argument('--baseline', '-b',
+                        help='Compare against results JSON from an earlier run')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Allowed slowdown against the baseline, as a fraction (default: {DEFAULT_THRESHOLD})')
+    args = parser.parse_args()
+    
+    print(f"📦 Preparing corpus in {Path(args.corpus).absolute()} (seed {args.seed}, scale {args.scale})")
+    manifest = ensure_corpus(args.corpus, args.seed, args.scale)
+    print(f"✓ {sum(manifest['files'].values()):,} file pairs, {manifest['bytes']:,} bytes")
+    
+    print(f"\n⏱ Running benchmarks ({args.repeat} runs each)")
+    ctx = BenchmarkContext(args.corpus, diff_backend=args.diff_backend)
+    results = run_benchmarks(ctx, args.scenario, args.repeat, manifest)
+    
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Results written to {Path(args.output).absolute()}")
+    
+    if not args.baseline:
+        return 0
+    
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('meta', {}).get('corpus') != manifest:
+        print("\n⚠ Warning: baseline was recorded on a different corpus")
+    
+    print(f"\n📊 Against baseline {args.baseline} (threshold +{args.threshold:.0%})")
+    regressions = 0
+    for name, base, current, ratio, regressed in compare_to_baseline(results, baseline, args.threshold):
+        mark = '✗' if regressed else '✓'
+        print(f"  {mark} {name:<24} {base * 1000:10.1f} ms -> {current * 1000:10.1f} ms  ({ratio - 1:+.1%})")
+        regressions += regressed
+    
+    if regressions:
+        print(f"\n❌ {regressions} scenario(s) regressed by more than {args.threshold:.0%}")
+        return 1
+    print("\n✓ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Deterministic synthetic corpus for the benchmarks
+
+generate_corpus(root) writes two trees, root/left and root/right, with one
+top-level folder per kind of change:
+
+    identical/   byte-identical pairs of mixed sizes
+    bitflips/    same size, a handful of flipped bytes spread over the file
+    truncated/   right file cut short
+    inserted/    bytes inserted in the middle of the right file (shifts the tail)
+    tiny/        many files of at most a few hundred bytes
+    huge/        a few large files with sparse differences
+    deep/        a deeply nested folder chain with a few files per level
+
+Every byte comes from random.Random(seed), so the same seed and scale always
+produce the same corpus.
+"""
+
+import json
+import os
+import random
+import shutil
+from pathlib import Path
+
+CORPUS_VERSION = 1
+CORPUS_KINDS = ('identical', 'bitflips', 'truncated', 'inserted', 'tiny', 'huge', 'deep')
+DEFAULT_SEED = 20240229
+MANIFEST_NAME = 'corpus.json'
+
+# File counts and sizes at scale 1.0; counts and the huge file size are multiplied by the scale
+CORPUS_SHAPE = {
+    'identical': {'count': 200, 'min_size': 4 * 1024, 'max_size': 64 * 1024},
+    'bitflips': {'count': 100, 'size': 256 * 1024, 'max_flips': 20},
+    'truncated': {'count': 50, 'min_size': 16 * 1024, 'max_size': 128 * 1024},
+    'inserted': {'count': 50, 'min_size': 16 * 1024, 'max_size': 128 * 1024, 'max_insert': 64},
+    'tiny': {'count': 5000, 'max_size': 256, 'per_folder': 500},
+    'huge': {'count': 3, 'size': 32 * 1024 * 1024, 'flips': 64},
+    'deep': {'depth': 32, 'per_level': 3, 'size': 2048},
+}
+
+
+def _random_bytes(rng, size):
+    """size pseudo-random bytes from rng"""
+    return rng.getrandbits(size * 8).to_bytes(size, 'little') if size else b''
+
+
+def _flip(data, rng, count):
+    """Copy of data with count bytes changed at random offsets"""
+    out = bytearray(data)
+    for _ in range(count):
+        pos = rng.randrange(len(out))
+        out[pos] ^= rng.randrange(1, 256)
+    return bytes(out)
+
+
+def _write_pair(left, right, rel_path, data1, data2):
+    for root, data in ((left, data1), (right, data2)):
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+
+
+def _scaled(count, scale):
+    return max(1, int(count * scale))
+
+
+def generate_corpus(root, seed=DEFAULT_SEED, scale=1.0):
+    """Write the left/right benchmark trees under root and return the manifest"""
+    root = Path(root)
+    left = root / 'left'
+    right = root / 'right'
+    for tree in (left, right):
+        if tree.exists():
+            shutil.rmtree(tree)
+    
+    rng = random.Random(seed)
+    files = {}
+    total_bytes = 0
+    
+    def write(rel_path, data1, data2):
+        nonlocal total_bytes
+        _write_pair(left, right, rel_path, data1, data2)
+        total_bytes += len(data1) + len(data2)
+    
+    shape = CORPUS_SHAPE['identical']
+    for i in range(_scaled(shape['count'], scale)):
+        data = _random_bytes(rng, rng.randint(shape['min_size'], shape['max_size']))
+        write(f"identical/file_{i:05d}.bin", data, data)
+    
+    shape = CORPUS_SHAPE['bitflips']
+    for i in range(_scaled(shape['count'], scale)):
+        data = _random_bytes(rng, shape['size'])
+        write(f"bitflips/file_{i:05d}.bin", data, _flip(data, rng, rng.randint(1, shape['max_flips'])))
+    
+    shape = CORPUS_SHAPE['truncated']
+    for i in range(_scaled(shape['count'], scale)):
+        data = _random_bytes(rng, rng.randint(shape['min_size'], shape['max_size']))
+        write(f"truncated/file_{i:05d}.bin", data, data[:rng.randrange(len(data))])
+    
+    shape = CORPUS_SHAPE['inserted']
+    for i in range(_scaled(shape['count'], scale)):
+        data = _random_bytes(rng, rng.randint(shape['min_size'], shape['max_size']))
+        pos = rng.randrange(len(data))
+        inserted = data[:pos] + _random_bytes(rng, rng.randint(1, shape['max_insert'])) + data[pos:]
+        write(f"inserted/file_{i:05d}.bin", data, inserted)
+    
+    shape = CORPUS_SHAPE['tiny']
+    for i in range(_scaled(shape['count'], scale)):
+        data = _random_bytes(rng, rng.randint(0, shape['max_size']))
+        other = _flip(data, rng, 1) if data and rng.random() < 0.1 else data
+        write(f"tiny/dir_{i // shape['per_folder']:03d}/file_{i:05d}.bin", data, other)
+    
+    shape = CORPUS_SHAPE['huge']
+    size = max(1024 * 1024, int(shape['size'] * scale))
+    for i in range(shape['count']):
+        data = _random_bytes(rng, size)
+        write(f"huge/file_{i:02d}.bin", data, _flip(data, rng, shape['flips']) if i else data)
+    
+    shape = CORPUS_SHAPE['deep']
+    folder = 'deep'
+    for level in range(shape['depth']):
+        folder = f"{folder}/level_{level:02d}"
+        for i in range(shape['per_level']):
+            data = _random_bytes(rng, shape['size'])
+            other = _flip(data, rng, 1) if i == 0 else data
+            write(f"{folder}/file_{i}.bin", data, other)
+    
+    for kind in CORPUS_KINDS:
+        files[kind] = sum(1 for _ in (left / kind).rglob('*') if _.is_file())
+    
+    manifest = {
+        'version': CORPUS_VERSION,
+        'seed': seed,
+        'scale': scale,
+        'files': files,
+        'bytes': total_bytes,
+    }
+    with open(root / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def ensure_corpus(root, seed=DEFAULT_SEED, scale=1.0):
+    """Reuse the corpus under root if it was generated with the same seed and scale"""
+    root = Path(root)
+    try:
+        with open(root / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if (manifest.get('version'), manifest.get('seed'), manifest.get('scale')) == (CORPUS_VERSION, seed, scale):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    os.makedirs(root, exist_ok=True)
+    return generate_corpus(root, seed, scale)
@@ -0,0 +1,166 @@
+"""
+Timed benchmark scenarios and baseline comparison
+
+Each scenario is a setup function that receives a BenchmarkContext and
+returns the callable to time; setup work (reading inputs, building the
+comparator) is not part of the measurement. Every scenario runs `repeat`
+times and the fastest run is used for baseline comparisons.
+"""
+
+import contextlib
+import importlib.metadata
+import io
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import BIN_Eye_Comparator as bec
+
+TEMPLATE_PATH = Path(bec.__file__).resolve().parent / 'template_report.html'
+# Bytes rendered by the hex_dump_html scenario
+HEX_DUMP_BYTES = 1024 * 1024
+# Fastest run may be this much slower than the baseline before it counts as a regression
+DEFAULT_THRESHOLD = 0.10
+
+
+class BenchmarkContext:
+    """Corpus location and comparator settings shared by all scenarios"""
+    
+    def __init__(self, corpus_root, diff_backend='auto', work_dir=None):
+        self.corpus_root = Path(corpus_root)
+        self.left = self.corpus_root / 'left'
+        self.right = self.corpus_root / 'right'
+        self.diff_backend = diff_backend
+        self.work_dir = Path(work_dir) if work_dir else Path(tempfile.mkdtemp(prefix='bec-bench-'))
+    
+    def comparator(self, path1=None, path2=None, **kwargs):
+        return bec.BinaryFileComparator(
+            path1 or self.left, path2 or self.right,
+            template_path=str(TEMPLATE_PATH), diff_backend=self.diff_backend, **kwargs
+        )
+    
+    def read_pair(self, rel_path):
+        with open(self.left / rel_path, 'rb') as f1, open(self.right / rel_path, 'rb') as f2:
+            return f1.read(), f2.read()
+
+
+def _quiet(func):
+    """Run func with stdout discarded; the comparator prints progress for every pair"""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func()
+    return run
+
+
+def setup_find_differences(ctx):
+    comparator = ctx.comparator()
+    data1, data2 = ctx.read_pair('huge/file_01.bin')
+    return lambda: comparator.find_differences(data1, data2)
+
+
+def setup_compare_huge(ctx):
+    comparator = ctx.comparator()
+    rel_path = 'huge/file_01.bin'
+    return lambda: comparator.compare_pair(ctx.left / rel_path, ctx.right / rel_path, rel_path)
+
+
+def setup_hex_dump_html(ctx):
+    comparator = ctx.comparator()
+    data1, data2 = ctx.read_pair('huge/file_01.bin')
+    data1 = data1[:HEX_DUMP_BYTES]
+    ranges = comparator.find_difference_ranges(data1, data2[:HEX_DUMP_BYTES])
+    return lambda: comparator.hex_dump_html(data1, highlight_ranges=ranges)
+
+
+def setup_get_common_files(ctx):
+    comparator = ctx.comparator()
+    return comparator.get_common_files
+
+
+def setup_generate_html_report(ctx):
+    comparator = ctx.comparator()
+    for file1, file2, rel_path in comparator.get_common_files()[0]:
+        if not rel_path.startswith('huge'):
+            comparator.record_result(comparator.compare_pair(file1, file2, rel_path))
+    output = ctx.work_dir / 'generate_html_report.html'
+    return _quiet(lambda: comparator.generate_html_report(str(output)))
+
+
+def setup_run_comparison(ctx):
+    output = ctx.work_dir / 'run_comparison.html'
+    
+    def run():
+        comparator = ctx.comparator()
+        comparator.run_comparison(generate_html=True, html_output=str(output))
+    return _quiet(run)
+
+
+# Scenario name -> setup function, in the order they run
+SCENARIOS = {
+    'find_differences': setup_find_differences,
+    'compare_huge': setup_compare_huge,
+    'hex_dump_html': setup_hex_dump_html,
+    'get_common_files': setup_get_common_files,
+    'generate_html_report': setup_generate_html_report,
+    'run_comparison': setup_run_comparison,
+}
+
+
+def time_scenario(func, repeat=3):
+    """Wall-clock seconds of each of `repeat` calls to func"""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return runs
+
+
+def run_benchmarks(ctx, names=None, repeat=3, manifest=None, report=print):
+    """Run the selected scenarios and return the results document"""
+    results = {}
+    for name, setup in SCENARIOS.items():
+        if names and name not in names:
+            continue
+        runs = time_scenario(setup(ctx), repeat)
+        results[name] = {
+            'min': min(runs),
+            'median': statistics.median(runs),
+            'runs': runs,
+        }
+        report(f"  {name:<24} {min(runs) * 1000:10.1f} ms  (median {statistics.median(runs) * 1000:.1f} ms)")
+    
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'diff_backend': ctx.comparator().diff_backend,
+            'numpy': importlib.metadata.version('numpy') if bec.HAS_NUMPY else None,
+            'hash_algorithm': bec.HASH_ALGORITHM,
+            'repeat': repeat,
+            'corpus': manifest,
+        },
+        'scenarios': results,
+    }
+
+
+def compare_to_baseline(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Compare fastest runs per scenario; returns a list of rows for scenarios in both documents
+    
+    Each row is (name, baseline_seconds, current_seconds, ratio, regressed).
+    """
+    rows = []
+    for name, result in current['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base or not base.get('min'):
+            continue
+        ratio = result['min'] / base['min']
+        rows.append((name, base['min'], result['min'], ratio, ratio > 1 + threshold))
+    return rows
@@ -0,0 +1,111 @@
+"""Both diff kernels must report the same offsets as the original per-byte loop"""
+
+import random
+
+import pytest
+
+from BIN_Eye_Comparator import (BinaryFileComparator, BLOCK_ALIGNMENT, DIFF_SCAN_STRIDE, HAS_NUMPY,
+                                MAX_DETAILED_DIFFERENCES)
+
+BACKENDS = [
+    'python',
+    pytest.param('numpy', marks=pytest.mark.skipif(not HAS_NUMPY, reason='numpy is not installed')),
+]
+
+
+def legacy_find_differences(data1, data2):
+    """The per-byte loop find_differences used before the batched kernels"""
+    differences = []
+    max_len = max(len(data1), len(data2))
+
+    for i in range(max_len):
+        byte1 = data1[i] if i < len(data1) else None
+        byte2 = data2[i] if i < len(data2) else None
+
+        if byte1 != byte2:
+            differences.append(i)
+
+    return differences
+
+
+def mutate(data, rng, count):
+    """Copy of data with count random bytes changed"""
+    data = bytearray(data)
+    for _ in range(count):
+        data[rng.randrange(len(data))] ^= rng.randrange(1, 256)
+    return bytes(data)
+
+
+@pytest.fixture
+def make_comparator(tmp_path):
+    def make(backend, block_size=BLOCK_ALIGNMENT):
+        file1 = tmp_path / 'a.bin'
+        file2 = tmp_path / 'b.bin'
+        file1.touch()
+        file2.touch()
+        return BinaryFileComparator(file1, file2, diff_backend=backend, block_size=block_size)
+    return make
+
+
+def boundary_cases():
+    stride = DIFF_SCAN_STRIDE
+    base = bytes(range(256)) * 8
+    yield b'', b''
+    yield b'', b'\x00\x01'
+    yield b'\x00' * 10, b''
+    yield b'abc', b'abc'
+    yield b'abc', b'abd'
+    yield b'abcdef', b'abc'
+    yield b'abc', b'abcdef'
+    # Differences on both sides of a slice edge, and a slice that differs only in its last byte
+    for offset in (0, stride - 1, stride, stride + 1, 2 * stride - 1):
+        changed = bytearray(base)
+        changed[offset] ^= 0xFF
+        yield base, bytes(changed)
+    # Lengths that end just before, at and just after a slice edge
+    for length in (stride - 1, stride, stride + 1):
+        yield base[:length], base[:length - 1] + b'\x00'
+    yield base, base[:stride + 7]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_boundary_cases(make_comparator, backend):
+    comparator = make_comparator(backend)
+    for data1, data2 in boundary_cases():
+        assert comparator.find_differences(data1, data2) == legacy_find_differences(data1, data2), (data1, data2)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_random_inputs(make_comparator, backend):
+    comparator = make_comparator(backend)
+    rng = random.Random(1234)
+    for _ in range(200):
+        length = rng.choice([1, 7, DIFF_SCAN_STRIDE, rng.randrange(1, 5000)])
+        data1 = rng.randbytes(length)
+        data2 = mutate(data1, rng, rng.randrange(0, 20))
+        # Unequal lengths in about a third of the cases
+        if rng.random() < 0.33:
+            data2 = data2[:rng.randrange(0, length + 1)] if rng.random() < 0.5 else data2 + rng.randbytes(rng.randrange(1, 300))
+        assert comparator.find_differences(data1, data2) == legacy_find_differences(data1, data2)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_runs_across_block_edges(make_comparator, tmp_path, backend):
+    """Streaming scans merge runs that cross block edges into the same offsets"""
+    block_size = BLOCK_ALIGNMENT
+    rng = random.Random(99)
+    data1 = rng.randbytes(3 * block_size + 123)
+    data2 = bytearray(data1)
+    for edge in (block_size, 2 * block_size, 3 * block_size):
+        for offset in range(edge - 3, edge + 3):
+            data2[offset] ^= 0x5A
+    data2 = bytes(data2) + b'tail'
+    (tmp_path / 'a.bin').write_bytes(data1)
+    (tmp_path / 'b.bin').write_bytes(data2)
+
+    comparator = make_comparator(backend, block_size)
+    scan = comparator.scan_files(tmp_path / 'a.bin', tmp_path / 'b.bin', max_display_bytes=len(data2), max_runs=None)
+    expected = legacy_find_differences(data1, data2)
+    assert list(scan['ranges'].offsets()) == expected
+    assert scan['ranges'].count == len(expected)
+    assert [offset for offset, _, _ in scan['detailed']] == expected[:MAX_DETAILED_DIFFERENCES]
@@ -0,0 +1,143 @@
+"""The lookup-table hex renderers must match the original per-byte formatting exactly"""
+
+import random
+
+import pytest
+
+from BIN_Eye_Comparator import (CONSOLE_HEX_STYLE, HTML_HEX_STYLE, DiffRanges, render_hex_dump,
+                                render_side_by_side)
+
+CONSOLE_MARKS = ('\033[91m', '\033[0m', '  ', '\033[91m✗\033[0m')
+HTML_MARKS = ('<span class="diff">', '</span>', '&nbsp;&nbsp;', '✗')
+
+
+def legacy_hex_dump(data, offset=0, highlight_ranges=None, html=False):
+    """The per-byte hex_dump and hex_dump_html used before the lookup tables"""
+    if highlight_ranges is None:
+        highlight_ranges = DiffRanges()
+    highlight_open, highlight_close, gap, _ = HTML_MARKS if html else CONSOLE_MARKS
+
+    lines = []
+    for i in range(0, len(data), 16):
+        chunk = data[i:i+16]
+        hex_offset = f"{offset + i:08X}"
+        highlight_positions = set()
+        for start, length in highlight_ranges.ranges_in(i, i + 16):
+            highlight_positions.update(range(start, start + length))
+
+        hex_parts = []
+        for j, byte in enumerate(chunk):
+            if i + j in highlight_positions:
+                hex_parts.append(f"{highlight_open}{byte:02X}{highlight_close}")
+            else:
+                hex_parts.append(f"{byte:02X}")
+        hex_str = ' '.join(hex_parts[:8]) + gap + ' '.join(hex_parts[8:])
+        if not html:
+            hex_str = hex_str.ljust(58)
+
+        ascii_parts = []
+        for j, byte in enumerate(chunk):
+            char = chr(byte) if 32 <= byte < 127 else '.'
+            if html:
+                char = char.replace('<', '&lt;').replace('>', '&gt;')
+            if i + j in highlight_positions:
+                ascii_parts.append(f"{highlight_open}{char}{highlight_close}")
+            else:
+                ascii_parts.append(char)
+        ascii_str = ''.join(ascii_parts)
+
+        if html:
+            lines.append(f'<div class="hex-line">{hex_offset}&nbsp;&nbsp;{hex_str}&nbsp;&nbsp;|{ascii_str}|</div>')
+        else:
+            lines.append(f"{hex_offset}  {hex_str}  |{ascii_str}|")
+
+    return '\n'.join(lines)
+
+
+def legacy_side_by_side(data1, data2, max_bytes=512, offset=0, html=False):
+    """The per-byte side_by_side_comparison used before the lookup tables"""
+    mismatch = HTML_MARKS[3] if html else CONSOLE_MARKS[3]
+    lines = []
+    lines.append(f"{'Offset':<10} {'File 1 (Hex + ASCII)':<50} {'File 2 (Hex + ASCII)':<50} {'Match'}")
+    lines.append('-' * 120)
+
+    max_len = min(max_bytes, max(len(data1), len(data2)))
+    for i in range(0, max_len, 16):
+        chunk1 = data1[i:i+16] if i < len(data1) else b''
+        hex1 = ' '.join(f"{b:02X}" for b in chunk1)
+        ascii1 = ''.join(chr(b) if 32 <= b < 127 else '.' for b in chunk1)
+        str1 = f"{hex1:<40} |{ascii1}|"
+
+        chunk2 = data2[i:i+16] if i < len(data2) else b''
+        hex2 = ' '.join(f"{b:02X}" for b in chunk2)
+        ascii2 = ''.join(chr(b) if 32 <= b < 127 else '.' for b in chunk2)
+        str2 = f"{hex2:<40} |{ascii2}|"
+
+        match = "✓" if chunk1 == chunk2 else mismatch
+        lines.append(f"{f'{offset + i:08X}':<10} {str1:<50} {str2:<50} {match}")
+
+    return '\n'.join(lines)
+
+
+STYLES = [
+    pytest.param(CONSOLE_HEX_STYLE, False, id='console'),
+    pytest.param(HTML_HEX_STYLE, True, id='html'),
+]
+
+
+def edge_cases():
+    """(data, highlight runs) pairs: empty input, partial last rows and runs on row boundaries"""
+    data = bytes(range(256)) + b'<tag>&'
+    yield b'', None
+    yield b'', DiffRanges([(0, 4)])
+    yield data[:5], None
+    yield data[:5], DiffRanges([(4, 3)])
+    yield data[:16], DiffRanges([(15, 1)])
+    yield data[:17], DiffRanges([(16, 1)])
+    yield data[:40], DiffRanges([(15, 2)])
+    yield data[:40], DiffRanges([(0, 40)])
+    yield data[:48], DiffRanges([(7, 2), (31, 2), (47, 1)])
+    yield data, DiffRanges([(250, 20)])
+    yield data, DiffRanges([(300, 4)])
+
+
+def random_cases(rng, count):
+    for _ in range(count):
+        data = rng.randbytes(rng.randrange(0, 200))
+        runs = DiffRanges()
+        position = rng.randrange(0, 8)
+        while position < len(data) + 8 and rng.random() < 0.8:
+            length = rng.randrange(1, 20)
+            runs.add(position, length)
+            position += length + rng.randrange(1, 30)
+        yield data, runs if runs else None
+
+
+@pytest.mark.parametrize('style, html', STYLES)
+def test_hex_dump_edge_cases(style, html):
+    for data, runs in edge_cases():
+        assert render_hex_dump(data, 0, runs, style) == legacy_hex_dump(data, 0, runs, html), (data, runs)
+
+
+@pytest.mark.parametrize('style, html', STYLES)
+def test_hex_dump_random_inputs(style, html):
+    rng = random.Random(4321)
+    for data, runs in random_cases(rng, 500):
+        offset = rng.choice([0, 16, 0x7A000000])
+        assert render_hex_dump(data, offset, runs, style) == legacy_hex_dump(data, offset, runs, html)
+
+
+@pytest.mark.parametrize('style, html', STYLES)
+def test_side_by_side(style, html):
+    rng = random.Random(8765)
+    cases = [(b'', b''), (b'abc', b''), (b'', b'abc'), (bytes(16), bytes(16)), (bytes(17), bytes(16) + b'\x01')]
+    for _ in range(300):
+        data1 = rng.randbytes(rng.randrange(0, 120))
+        data2 = bytearray(data1[:rng.randrange(0, len(data1) + 1)] + rng.randbytes(rng.randrange(0, 20)))
+        if data2 and rng.random() < 0.5:
+            data2[rng.randrange(len(data2))] ^= 0xFF
+        cases.append((data1, bytes(data2)))
+    for data1, data2 in cases:
+        max_bytes = rng.choice([0, 16, 40, 512])
+        assert (render_side_by_side(data1, data2, max_bytes, 0, style)
+                == legacy_side_by_side(data1, data2, max_bytes, 0, html)), (data1, data2, max_bytes)